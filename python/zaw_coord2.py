@@ -1,7 +1,11 @@
 __authors__ = ["Zach Werginz", "Andres Munoz-Jaramillo"]
 __email__ = ["zachary.werginz@snc.edu", "amunozj@gsu.edu"]
 
+import concurrent.futures
+import math
+
 import numpy as np
+from numba import njit, prange, vectorize
 import sunpy.map
 from sunpy.sun import constants
 from sunpy.sun import sun
@@ -13,6 +17,106 @@ RSUN_METERS = sun.constants.radius.si.value
 DSUN_METERS = sun.constants.au.si.value
 
 
+@njit(parallel=True, fastmath=True)
+def _helio_kernel(txrow, tyrow, Robs, max_rat2, hgln, hglt):
+	"""Fused per-pixel heliographic transform.
+
+	Runs the whole trig pipeline in registers for each pixel, taking
+	only the precomputed 1-D tangent rows and writing
+	longitude/latitude (radians) once, instead of allocating a
+	temporary per ufunc.
+	"""
+	ydim = tyrow.shape[0]
+	xdim = txrow.shape[0]
+	for i in prange(ydim):
+		yyat = tyrow[i]
+		for j in range(xdim):
+			xxat = txrow[j]
+			rat2 = xxat*xxat + yyat*yyat
+			phi = math.atan2(xxat, yyat)
+			rat2 = min(rat2, max_rat2)
+			ras2 = rat2/(1.0 + rat2)
+			d1 = 1.0 - ras2
+			# At the limb clamp d2 is rounding noise around zero; keep
+			# it out of sqrt's negative domain.
+			d2 = max(1.0 - Robs*Robs*ras2, 0.0)
+			x = ras2*Robs + math.sqrt(d1)*math.sqrt(d2)
+			rr = math.sqrt(rat2*Robs)
+			hglt[i, j] = math.asin(math.cos(phi)*rr)
+			hgln[i, j] = math.atan2(x, math.sin(phi)*rr)
+
+
+@njit(parallel=True, fastmath=True)
+def _solid_angle(clat, slat, clon, slon, out):
+	"""Per-pixel solid angle of the pyramid spanned by the four pixel
+	corners. Takes the sin/cos planes of the (ydim + 1, xdim + 1)
+	corner grid directly, so every corner unit vector is assembled in
+	registers from unit-stride loads instead of gathering across a
+	strided (3, ydim, xdim) stack.
+	"""
+	ydim, xdim = out.shape
+	for i in prange(ydim):
+		for j in range(xdim):
+			# Corner unit vectors: UL, LL, LR, UR.
+			r1x = clat[i, j]*clon[i, j]
+			r1y = clat[i, j]*slon[i, j]
+			r1z = slat[i, j]
+			r2x = clat[i + 1, j]*clon[i + 1, j]
+			r2y = clat[i + 1, j]*slon[i + 1, j]
+			r2z = slat[i + 1, j]
+			r3x = clat[i + 1, j + 1]*clon[i + 1, j + 1]
+			r3y = clat[i + 1, j + 1]*slon[i + 1, j + 1]
+			r3z = slat[i + 1, j + 1]
+			r4x = clat[i, j + 1]*clon[i, j + 1]
+			r4y = clat[i, j + 1]*slon[i, j + 1]
+			r4z = slat[i, j + 1]
+
+			cx1 = r1y*r2z - r1z*r2y
+			cy1 = r1z*r2x - r1x*r2z
+			cz1 = r1x*r2y - r1y*r2x
+			num1 = cx1*r3x + cy1*r3y + cz1*r3z
+
+			cx2 = r3y*r4z - r3z*r4y
+			cy2 = r3z*r4x - r3x*r4z
+			cz2 = r3x*r4y - r3y*r4x
+			num2 = cx2*r1x + cy2*r1y + cz2*r1z
+
+			d12 = r1x*r2x + r1y*r2y + r1z*r2z
+			d23 = r2x*r3x + r2y*r3y + r2z*r3z
+			d31 = r3x*r1x + r3y*r1y + r3z*r1z
+			d34 = r3x*r4x + r3y*r4y + r3z*r4z
+			d41 = r4x*r1x + r4y*r1y + r4z*r1z
+
+			out[i, j] = (2*math.atan2(num1, d12 + d23 + d31 + 1.0)
+					+ 2*math.atan2(num2, d34 + d41 + d31 + 1.0))
+
+
+@vectorize(['float32(float32, float32, float32, float32, float32)',
+		'float64(float64, float64, float64, float64, float64)'],
+		nopython=True, target='parallel')
+def _corr_factor_uf(lath, lonh, Xobs, Yobs, Zobs):
+	"""LOS projection factor as a typed ufunc: the sin/cos calls and
+	the dot product with the observer vector happen per element in
+	registers, streaming the coordinate grids through memory once.
+	"""
+	slat = math.sin(lath)
+	clat = math.cos(lath)
+	slon = math.sin(lonh)
+	clon = math.cos(lonh)
+	return clat*clon*Xobs + clat*slon*Yobs + slat*Zobs
+
+
+@njit(parallel=True, fastmath=True)
+def _flux_kernel(area, field, corr, out):
+	"""Fused area*field/corr_factor: one read of each input, one write,
+	with no corrected-field intermediate.
+	"""
+	ydim, xdim = out.shape
+	for i in prange(ydim):
+		for j in range(xdim):
+			out[i, j] = area[i, j]*field[i, j]/corr[i, j]
+
+
 class CRD:
 	"""Calculates various magnetogram coordinate information.
 	Can calculate heliographic coordinate information,
@@ -23,10 +127,21 @@ class CRD:
 	as an instance attribute for the object.
 
 	"""
-	
-	def __init__(self, filename):
-		"""Reads magnetogram as a sunpy.map object."""
+
+	# Row-band height for the tiled eoa computation; a band of trig
+	# planes this tall stays L2 resident between pipeline stages.
+	_TILE = 256
+
+	def __init__(self, filename, dtype=np.float32):
+		"""Reads magnetogram as a sunpy.map object.
+
+		The projection-geometry grids are carried in dtype (float32 by
+		default, which halves memory traffic and doubles SIMD width;
+		the magnetogram data itself is insensitive to the difference).
+		Pass dtype=np.float64 for double precision throughout.
+		"""
 		self.im_raw = sunpy.map.Map(filename)
+		self._dtype = dtype
 		try:
 			self.B0 = self.im_raw.meta['B0']
 		except KeyError:
@@ -44,14 +159,66 @@ class CRD:
 		except KeyError:
 			self.Y0 = self.im_raw.meta['IMG_Y0']
 		if self.im_raw.detector == 'SPMG':
-			self.rsun = self.im_raw.rsun_obs.value / self.im_raw.meta['SCALE']	
+			self.rsun = self.im_raw.rsun_obs.value / self.im_raw.meta['SCALE']
 		else:
 			self.rsun = self.im_raw.rsun_obs.value
+
+		# The observer distance in solar radii, the off-limb clamp and
+		# the arcmin-to-radian factor (which folds the /60 and deg2rad
+		# into one multiply per pixel) depend only on header values.
+		self._amin_to_rad = math.pi/(180.0*60.0)
+		self._Robs = 1.0/math.tan(math.radians(self.rsun/60.0))
+		max_ra = math.asin(1.0/self._Robs)
+		self._max_rat2 = math.tan(max_ra)*math.tan(max_ra)
+
+		# Pixel-center and pixel-corner coordinate rows, and their
+		# tangents, are fixed by the header; compute them once so
+		# repeat heliographic/eoa calls skip the O(xdim + ydim) trig.
+		xScl = self.im_raw.scale[0].value
+		yScl = self.im_raw.scale[1].value
+		xdim = int(np.floor(self.im_raw.dimensions[0].value))
+		ydim = int(np.floor(self.im_raw.dimensions[1].value))
+		a2r = self._dtype(self._amin_to_rad)
+
+		self.xrow = ((np.arange(0, xdim, dtype=self._dtype)
+				- self.X0)*xScl).astype(self._dtype, copy=False)
+		self.yrow = ((np.arange(0, ydim, dtype=self._dtype)
+				- self.Y0)*yScl).astype(self._dtype, copy=False)
+		self._tan_x = np.tan(self.xrow*a2r)
+		self._tan_y = np.tan(-self.yrow*a2r)
+
+		xrow_c = ((np.arange(0, xdim + 1, dtype=self._dtype)
+				- self.X0 - 0.5)*xScl).astype(self._dtype, copy=False)
+		yrow_c = ((np.arange(0, ydim + 1, dtype=self._dtype)
+				- self.Y0 - 0.5)*yScl).astype(self._dtype, copy=False)
+		self._tan_x_c = np.tan(xrow_c*a2r)
+		self._tan_y_c = np.tan(-yrow_c*a2r)
+
+		# Observer unit vector never changes for a given magnetogram.
+		b0_r = np.deg2rad(self.B0)
+		l0_r = np.deg2rad(self.L0)
+		self._obs = (self._dtype(np.cos(b0_r)*np.cos(l0_r)),
+					self._dtype(np.cos(b0_r)*np.sin(l0_r)),
+					self._dtype(np.sin(b0_r)))
+
+		# Memoized full-grid results, keyed by pixel shift. Radians are
+		# cached so los_corr and eoa skip the degree round-trip.
+		self._helio_cache = {}
+		self._corr_cache = None
 		
 
 	def __repr__(self):
-		#TODO
-		return None
+		return 'CRD(B0={0}, L0={1}, rsun={2}, detector={3})'.format(
+				self.B0, self.L0, self.rsun, self.im_raw.detector)
+
+	@property
+	def rg(self):
+		"""Distance of each pixel from disk center, built on demand.
+
+		Only the 1-D coordinate rows are kept as attributes; the full
+		2-D grid broadcasts out of them when actually needed.
+		"""
+		return np.hypot(self.xrow[None, :], self.yrow[:, None])
 
 	def heliographic(self, *args):
 		"""Calculate hg coordinates from hpc and returns it.
@@ -71,78 +238,132 @@ class CRD:
 		aia.heliographic(320, 288)
 		"""
 
-		xScl = self.im_raw.scale[0].value
-		yScl = self.im_raw.scale[1].value
-		
 		# Check for single coordinate or ndarray object.
 		if isinstance(args[0], np.ndarray):
-			# Retrieve integer dimensions and create arrays holding
-			# x and y coordinates of each pixel
-			xdim = np.int(np.floor(self.im_raw.dimensions[0].value))
-			ydim = np.int(np.floor(self.im_raw.dimensions[1].value))
 			try:
-				xrow = (np.arange(0, xdim) - self.X0 + args[1])*xScl
-				yrow = (np.arange(0, ydim) - self.Y0 + args[2])*yScl
-				self.xg, self.yg = np.meshgrid(xrow, yrow, indexing='xy')
-				self.rg = np.sqrt(self.xg**2 + self.yg**2)
-				x = self.xg
-				y = -self.yg
+				shift = (args[1], args[2])
 			except IndexError:
-				xrow = (np.arange(0, xdim) - self.X0)*xScl
-				yrow = (np.arange(0, ydim) - self.Y0)*yScl
-				self.xg, self.yg = np.meshgrid(xrow, yrow, indexing='xy')
-				self.rg = np.sqrt(self.xg**2 + self.yg**2)
-				x = self.xg
-				y = -self.yg
-		else:
-			# Have to switch coordinate conventions because calculations
-			# assume standard cartesian whereas python indexing is 
-			# [row, column]
-			x = (args[1] - self.X0)*xScl/60.0
-			y = (self.Y0 - args[0])*yScl/60.0
-
-		b0_r = np.deg2rad(self.B0)
-		radius = self.rsun
-		Robs = 1/np.tan(np.deg2rad(radius/60))
-
-		xxat = np.tan(np.deg2rad(x/60))
-		yyat = np.tan(np.deg2rad(y/60))
+				shift = (0.0, 0.0)
+			lonh_r, lath_r = self._heliographic_rad(shift)
+			hgln = np.rad2deg(lonh_r)
+			hglt = np.rad2deg(lath_r)
 
-		rat2 = (xxat**2 + yyat**2)
-		phi = 0*rat2
-		w_rat2 = np.where(rat2 is not 0)
-		phi[w_rat2] = np.arctan2(xxat[w_rat2], yyat[w_rat2])
+			# Only add the instance attribute if it doesn't exist.
+			if not hasattr(self, 'lonh'):
+				self.lonh = hgln
+				self.lath = hglt
+			return hgln, hglt
 
-		max_ra = np.arcsin(1.0/Robs)
-		max_rat2 = np.tan(max_ra)*np.tan(max_ra)
-
-		ii = np.where(rat2 > max_rat2)
-		if ii[0].any() > 0:
-			rat2[ii] = max_rat2
-			#offlimb[ii] = 1
-
-		###############################################
-		ras2 = 0*rat2
-		ras2[w_rat2] = 1.0/(1.0 + 1.0/rat2[w_rat2])
-		d1 = (1.0 - ras2)
-		d2 = (1.0 - (Robs**2*ras2))
-		x = ras2*Robs + np.sqrt(d1)*np.sqrt(d2)
-		rr = np.sqrt(rat2*Robs)
-		t1 = np.sin(phi)*rr
-		t2 = np.cos(phi)*rr
-
-		hglt = np.arcsin(t2)
-		hgln = np.arctan2(x, t1)
+		xScl = self.im_raw.scale[0].value
+		yScl = self.im_raw.scale[1].value
 
+		# Have to switch coordinate conventions because calculations
+		# assume standard cartesian whereas python indexing is
+		# [row, column]
+		x = (args[1] - self.X0)*xScl
+		y = (self.Y0 - args[0])*yScl
 
+		hgln, hglt = self._helio_point(x, y)
+		return math.degrees(hgln), math.degrees(hglt)
 
+	def _helio_point(self, x, y):
+		"""Heliographic longitude/latitude (radians) of one coordinate.
 
-		# Only add the instance attribute if it doesn't exist.
-		if isinstance(args[0], np.ndarray) and not hasattr(self, 'lonh'):
-			self.lonh = np.rad2deg(hgln)
-			self.lath = np.rad2deg(hglt)
+		Pure scalar math: a single call costs ~20 flops instead of
+		dispatching the array ufunc machinery per operation.
+		"""
+		xxat = math.tan(x*self._amin_to_rad)
+		yyat = math.tan(y*self._amin_to_rad)
+
+		rat2 = xxat*xxat + yyat*yyat
+		# atan2(0, 0) is defined as 0, so disk center needs no mask.
+		phi = math.atan2(xxat, yyat)
+
+		# Branchless clamp for off-limb pixels.
+		rat2 = min(rat2, self._max_rat2)
+
+		ras2 = rat2/(1.0 + rat2)
+		d1 = 1.0 - ras2
+		# At the limb clamp d2 is rounding noise around zero; keep it
+		# out of sqrt's negative domain.
+		d2 = max(1.0 - self._Robs*self._Robs*ras2, 0.0)
+		x = ras2*self._Robs + math.sqrt(d1)*math.sqrt(d2)
+		rr = math.sqrt(rat2*self._Robs)
+
+		hglt = math.asin(math.cos(phi)*rr)
+		hgln = math.atan2(x, math.sin(phi)*rr)
+		return hgln, hglt
+
+	def _heliographic_rad(self, shift=(0.0, 0.0)):
+		"""Full-grid heliographic coordinates in radians, memoized.
+
+		los_corr, eoa and magnetic_flux all funnel through this same
+		trig pipeline, so the first call per pixel shift does the work
+		and later calls return the cached arrays.
+		"""
+		if shift in self._helio_cache:
+			return self._helio_cache[shift]
 
-		return np.rad2deg(hgln), np.rad2deg(hglt)
+		if shift == (0.0, 0.0):
+			txrow, tyrow = self._tan_x, self._tan_y
+		else:
+			xScl = self.im_raw.scale[0].value
+			yScl = self.im_raw.scale[1].value
+			a2r = self._dtype(self._amin_to_rad)
+			xrow = ((np.arange(0, self.xrow.shape[0], dtype=self._dtype)
+					- self.X0 + shift[0])*xScl).astype(self._dtype, copy=False)
+			yrow = ((np.arange(0, self.yrow.shape[0], dtype=self._dtype)
+					- self.Y0 + shift[1])*yScl).astype(self._dtype, copy=False)
+			txrow = np.tan(xrow*a2r)
+			tyrow = np.tan(-yrow*a2r)
+
+		# Fused kernel keeps the whole pipeline in registers.
+		hgln = np.empty((tyrow.shape[0], txrow.shape[0]), dtype=self._dtype)
+		hglt = np.empty_like(hgln)
+		_helio_kernel(txrow, tyrow, self._dtype(self._Robs),
+				self._dtype(self._max_rat2), hgln, hglt)
+
+		self._helio_cache[shift] = (hgln, hglt)
+		return hgln, hglt
+
+	def _solid_angle_tiled(self):
+		"""Solid angle of every pixel, computed in row bands.
+
+		Adjacent pixels share corners, so the (ydim + 1, xdim + 1)
+		corner grid supplies all four corners of every pixel. Rather
+		than materializing that grid and its four trig planes at full
+		size, each band of _TILE rows runs the corner evaluation,
+		sin/cos, and the solid-angle kernel while its working set is
+		still cache resident, writing straight into the output rows.
+		"""
+		txrow_c = self._tan_x_c
+		tyrow_c = self._tan_y_c
+		xdim = txrow_c.shape[0] - 1
+		ydim = tyrow_c.shape[0] - 1
+
+		# One set of band-sized buffers serves every iteration; the
+		# trig results land in them via out= instead of fresh arrays.
+		lon_t = np.empty((self._TILE + 1, xdim + 1), dtype=self._dtype)
+		lat_t = np.empty_like(lon_t)
+		slat_t = np.empty_like(lon_t)
+		clat_t = np.empty_like(lon_t)
+		slon_t = np.empty_like(lon_t)
+		clon_t = np.empty_like(lon_t)
+
+		solid_angle = np.empty((ydim, xdim), dtype=self._dtype)
+		for i0 in range(0, ydim, self._TILE):
+			i1 = min(i0 + self._TILE, ydim)
+			n = i1 - i0 + 1
+			_helio_kernel(txrow_c, tyrow_c[i0:i1 + 1],
+					self._dtype(self._Robs), self._dtype(self._max_rat2),
+					lon_t[:n], lat_t[:n])
+			np.sin(lat_t[:n], out=slat_t[:n])
+			np.cos(lat_t[:n], out=clat_t[:n])
+			np.sin(lon_t[:n], out=slon_t[:n])
+			np.cos(lon_t[:n], out=clon_t[:n])
+			_solid_angle(clat_t[:n], slat_t[:n], clon_t[:n], slon_t[:n],
+					solid_angle[i0:i1])
+		return solid_angle
 
 	def los_corr(self, *args):
 		"""Takes in coordinates and returns corrected magnetic field.
@@ -153,22 +374,28 @@ class CRD:
 		"""
 
 		if isinstance(args[0], np.ndarray):
-			lonh, lath = np.deg2rad(self.heliographic(args[0]))
-		else:
-			lonh, lath = np.deg2rad(self.heliographic(args[0], args[1]))
+			self.im_corr = self.im_raw.data/self._corr_factor_grid()
+			return self.im_corr
 
-		Xobs = np.cos(np.deg2rad(B0))*np.cos(np.deg2rad(self.L0))
-		Yobs = np.cos(np.deg2rad(B0))*np.sin(np.deg2rad(self.L0))
-		Zobs = np.sin(np.deg2rad(B0))
+		lonh, lath = np.deg2rad(self.heliographic(args[0], args[1]))
+		Xobs, Yobs, Zobs = self._obs
 
-		corr_factor = (np.cos(lath)*np.cos(lonh)*Xobs
-					   + np.cos(lath)*np.sin(lonh)*Yobs
-					   + np.sin(lath)*Zobs)
-		if isinstance(args[0], np.ndarray):
-			self.im_corr = self.im_raw.data/corr_factor
-			return self.im_corr
-		else:
-			return self.im_raw.data[args[0], args[1]]/corr_factor
+		# Take each sin/cos once instead of re-evaluating per term.
+		slat, clat = np.sin(lath), np.cos(lath)
+		slon, clon = np.sin(lonh), np.cos(lonh)
+		corr_factor = clat*clon*Xobs + clat*slon*Yobs + slat*Zobs
+		return self.im_raw.data[args[0], args[1]]/corr_factor
+
+	def _corr_factor_grid(self):
+		"""Full-grid LOS projection factor, cached on the instance."""
+		if self._corr_cache is not None:
+			return self._corr_cache
+
+		lonh, lath = self._heliographic_rad()
+		Xobs, Yobs, Zobs = self._obs
+
+		self._corr_cache = _corr_factor_uf(lath, lonh, Xobs, Yobs, Zobs)
+		return self._corr_cache
 
 	def eoa(self, *args):
 		""" Takes in coordinates and returns the area of pixels on sun.
@@ -184,10 +411,7 @@ class CRD:
 		#Information on pixel standard is in this article.
 		#http://www.aanda.org/component/article?access=bibcode&bibcode=&bibcode=2002A%2526A...395.1061GFUL
 		if isinstance(args[0], np.ndarray):
-			lonUL, latUL = self.heliographic(args[0], -.5, -.5)
-			lonLL, latLL = self.heliographic(args[0], .5, -.5)
-			lonLR, latLR = self.heliographic(args[0], .5, .5)
-			lonUR, latUR = self.heliographic(args[0], -.5, .5)
+			solid_angle = self._solid_angle_tiled()
 		else:
 			x = args[0]
 			y = args[1]
@@ -196,51 +420,110 @@ class CRD:
 			lonLR, latLR = self.heliographic(x + .5, y + .5)
 			lonUR, latUR = self.heliographic(x - .5, y + .5)
 
-		# Calculating unit vectors of pixel corners for solid angle.
-		r1 = np.array([np.cos(np.deg2rad(latUL))*np.cos(np.deg2rad(lonUL)),
-						np.cos(np.deg2rad(latUL))*np.sin(np.deg2rad(lonUL)),
-						np.sin(np.deg2rad(latUL))])
-
-		r2 = np.array([np.cos(np.deg2rad(latLL))*np.cos(np.deg2rad(lonLL)),
-						np.cos(np.deg2rad(latLL))*np.sin(np.deg2rad(lonLL)),
-						np.sin(np.deg2rad(latLL))])
-
-		r3 = np.array([np.cos(np.deg2rad(latLR))*np.cos(np.deg2rad(lonLR)),
-						np.cos(np.deg2rad(latLR))*np.sin(np.deg2rad(lonLR)),
-						np.sin(np.deg2rad(latLR))])
-
-		r4 = np.array([np.cos(np.deg2rad(latUR))*np.cos(np.deg2rad(lonUR)),
-						np.cos(np.deg2rad(latUR))*np.sin(np.deg2rad(lonUR)),
-						np.sin(np.deg2rad(latUR))])
-
-		# Calculate solid angle of pixel based on a pyrimid shaped polygon.
-		# See 
-		cross1 = np.cross(r1, r2, axis=0)
-		cross2 = np.cross(r3, r4, axis=0)
-		numerator1 = dot(cross1, r3)
-		numerator2 = dot(cross2, r1)
-		solid_angle1 = 2*np.arctan2(numerator1,
-						(dot(r1, r2) + dot(r2, r3) + dot(r3, r1) + 1))
-		solid_angle2 = 2*np.arctan2(numerator2, 
-						(dot(r3, r4) + dot(r4, r1) + dot(r3, r1) + 1))
-		solid_angle = solid_angle1 + solid_angle2
+			# Calculating unit vectors of pixel corners for solid angle.
+			r1 = np.array([np.cos(np.deg2rad(latUL))*np.cos(np.deg2rad(lonUL)),
+							np.cos(np.deg2rad(latUL))*np.sin(np.deg2rad(lonUL)),
+							np.sin(np.deg2rad(latUL))])
+
+			r2 = np.array([np.cos(np.deg2rad(latLL))*np.cos(np.deg2rad(lonLL)),
+							np.cos(np.deg2rad(latLL))*np.sin(np.deg2rad(lonLL)),
+							np.sin(np.deg2rad(latLL))])
+
+			r3 = np.array([np.cos(np.deg2rad(latLR))*np.cos(np.deg2rad(lonLR)),
+							np.cos(np.deg2rad(latLR))*np.sin(np.deg2rad(lonLR)),
+							np.sin(np.deg2rad(latLR))])
+
+			r4 = np.array([np.cos(np.deg2rad(latUR))*np.cos(np.deg2rad(lonUR)),
+							np.cos(np.deg2rad(latUR))*np.sin(np.deg2rad(lonUR)),
+							np.sin(np.deg2rad(latUR))])
+
+			# Calculate solid angle of pixel based on a pyrimid shaped
+			# polygon.
+			numerator1 = _cross_dot(r1.reshape(3, -1), r2.reshape(3, -1),
+							r3.reshape(3, -1)).reshape(())
+			numerator2 = _cross_dot(r3.reshape(3, -1), r4.reshape(3, -1),
+							r1.reshape(3, -1)).reshape(())
+			solid_angle1 = 2*np.arctan2(numerator1,
+							(dot(r1, r2) + dot(r2, r3) + dot(r3, r1) + 1))
+			solid_angle2 = 2*np.arctan2(numerator2,
+							(dot(r3, r4) + dot(r4, r1) + dot(r3, r1) + 1))
+			solid_angle = solid_angle1 + solid_angle2
 		r = 6.957e10 * u.cm
 
 		if isinstance(args[0], np.ndarray):
-			self.area = np.abs((r**2)*solid_angle)
-			ind = np.where(self.rg > self.rsun)
+			# Scale and abs in place; solid_angle is already a private
+			# full-size buffer.
+			np.multiply(solid_angle, (r*r).value, out=solid_angle)
+			np.abs(solid_angle, out=solid_angle)
+			self.area = u.Quantity(solid_angle, r.unit*r.unit)
+			ind = np.where(self.yrow[:, None]*self.yrow[:, None]
+						+ self.xrow[None, :]*self.xrow[None, :]
+						> self.rsun*self.rsun)
 			self.area[ind] = np.nan
 			return self.area
 		else:
-			return np.abs((r**2)*solid_angle)
+			return np.abs((r*r)*solid_angle)
 
 	def magnetic_flux(self, *args):
 		""" Takes in coordinates and returns magnetic flux of pixel."""
-		area = self.area(*args)
-		field = self.los_corr(*args)
+		area = self.eoa(*args)
 		if isinstance(args[0], np.ndarray):
-			self.mgnt_flux = area*field
+			# Fuse area*field/corr_factor in one pass instead of
+			# materializing the corrected field first.
+			field = self.im_raw.data.astype(self._dtype, copy=False)
+			flux = np.empty(field.shape, dtype=self._dtype)
+			_flux_kernel(np.asarray(area), field,
+					self._corr_factor_grid(), flux)
+			self.mgnt_flux = u.Quantity(flux, u.cm*u.cm)
+			return self.mgnt_flux
+		field = self.los_corr(*args)
 		return area*field
 
+class CRDBatch:
+	"""Streams a sequence of magnetograms through the CRD pipeline.
+
+	The numba kernels live at module level, so their JIT compilation
+	cost is paid on the first frame and amortized over the whole run.
+	While one frame computes, the next file is loaded on a worker
+	thread so FITS I/O overlaps with the kernels.
+
+	Example:
+	for mgnt in CRDBatch(filenames):
+		pf.append(np.nansum(mgnt.mgnt_flux))
+	"""
+
+	def __init__(self, files, dtype=np.float32):
+		self.files = list(files)
+		self._dtype = dtype
+
+	def __len__(self):
+		return len(self.files)
+
+	def __iter__(self):
+		if not self.files:
+			return
+		with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+			pending = pool.submit(CRD, self.files[0], self._dtype)
+			for k in range(len(self.files)):
+				mgnt = pending.result()
+				if k + 1 < len(self.files):
+					# Prefetch the next frame while this one computes.
+					pending = pool.submit(CRD, self.files[k + 1],
+							self._dtype)
+				mgnt.magnetic_flux(mgnt.im_raw.data)
+				yield mgnt
+
+
 def dot(a, b):
-	return  np.array(a[0]*b[0] + a[1]*b[1] + a[2]*b[2])
\ No newline at end of file
+	return np.einsum('i...,i...->...', a, b)
+
+@njit
+def _cross_dot(a, b, c):
+	"""Computes dot(cross(a, b), c) without building the cross product array."""
+	out = np.empty(a.shape[1], dtype=a.dtype)
+	for k in range(a.shape[1]):
+		cx = a[1, k]*b[2, k] - a[2, k]*b[1, k]
+		cy = a[2, k]*b[0, k] - a[0, k]*b[2, k]
+		cz = a[0, k]*b[1, k] - a[1, k]*b[0, k]
+		out[k] = cx*c[0, k] + cy*c[1, k] + cz*c[2, k]
+	return out
\ No newline at end of file